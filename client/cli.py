@@ -5,18 +5,71 @@ CLI client for the email agent server.
 Usage:
     python -m client.cli --from "sender@example.com" --to "recipient@example.com" --subject "Subject" "email body"
     python -m client.cli --from "sender@example.com" --to "recipient@example.com" --subject "Subject" --thread-id "thread-123" "continue conversation"
+    python -m client.cli --from "sender@example.com" --to "recipient@example.com" --subject "Subject" --stream "email body"
+    python -m client.cli --batch emails.jsonl --concurrency 8
 """
 
 import argparse
-import json
+import asyncio
+import atexit
 import sys
-from typing import Optional
+from typing import Iterator, Optional
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 DEFAULT_SERVER_URL = "http://localhost:8000"
 
 
+def create_session() -> requests.Session:
+    """Create a pooled HTTP session so repeated calls reuse the same connection."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        # Only connection failures are retried: urllib3 never retries a POST after the
+        # server has responded, so /invoke (which may send email) is never replayed
+        max_retries=Retry(total=3, backoff_factor=0.2),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip",
+    })
+    return session
+
+
+# Shared session (HTTP keep-alive + connection pooling across invocations)
+_SESSION = create_session()
+atexit.register(_SESSION.close)
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """Create a pooled async client for batched requests.
+
+    HTTP/2 is only negotiated over https:// with an HTTP/2-capable server (e.g. behind a
+    proxy); against uvicorn directly, requests use up to `concurrency` HTTP/1.1 connections.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=300,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    )
+
+
+def positive_int(value: str) -> int:
+    """argparse type for integers >= 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def create_email_input(
     content: str,
     from_email: str,
@@ -32,15 +85,12 @@ def create_email_input(
     }
 
 
-def invoke_agent(
+def create_payload(
     email_input: dict,
-    server_url: str = DEFAULT_SERVER_URL,
     thread_id: Optional[str] = None,
     source: str = "CLI",
 ) -> dict:
-    """Send request to the email agent server."""
-    url = f"{server_url}/invoke"
-    
+    """Create the /invoke request body."""
     payload = {
         "email_input": email_input,
         "source": source,
@@ -50,25 +100,120 @@ def invoke_agent(
     if thread_id:
         payload["thread_id"] = thread_id
     
+    return payload
+
+
+def invoke_agent(
+    email_input: dict,
+    server_url: str = DEFAULT_SERVER_URL,
+    thread_id: Optional[str] = None,
+    source: str = "CLI",
+    keep_alive: bool = True,
+) -> dict:
+    """Send request to the email agent server."""
+    url = f"{server_url}/invoke"
+    payload = create_payload(email_input, thread_id, source)
+    
     try:
-        response = requests.post(url, json=payload, timeout=300)
+        if keep_alive:
+            response = _SESSION.post(url, json=payload, timeout=300)
+        else:
+            response = requests.post(url, json=payload, timeout=300)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.RequestException as e:
+        exit_on_request_error(e, server_url)
+
+
+def invoke_agent_stream(
+    email_input: dict,
+    server_url: str = DEFAULT_SERVER_URL,
+    thread_id: Optional[str] = None,
+    source: str = "CLI",
+    keep_alive: bool = True,
+) -> Iterator[dict]:
+    """Stream graph updates from the email agent server as they are produced."""
+    url = f"{server_url}/invoke/stream"
+    payload = create_payload(email_input, thread_id, source)
+    post = _SESSION.post if keep_alive else requests.post
+    
+    try:
+        with post(url, json=payload, timeout=300, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield orjson.loads(line)
+    except requests.exceptions.RequestException as e:
+        exit_on_request_error(e, server_url)
+
+
+def exit_on_request_error(e: requests.exceptions.RequestException, server_url: str):
+    """Report a failed request to the server and exit."""
+    if isinstance(e, requests.exceptions.ConnectionError):
         print(f"Error: Could not connect to server at {server_url}", file=sys.stderr)
         print("Make sure the server is running with: uvicorn server.server:app", file=sys.stderr)
-        sys.exit(1)
-    except requests.exceptions.HTTPError as e:
+    elif isinstance(e, requests.exceptions.HTTPError):
         print(f"Error: Server returned {e.response.status_code}", file=sys.stderr)
         try:
             error_detail = e.response.json()
             print(f"Details: {error_detail}", file=sys.stderr)
         except:
             print(f"Details: {e.response.text}", file=sys.stderr)
-        sys.exit(1)
-    except requests.exceptions.Timeout:
+    elif isinstance(e, requests.exceptions.Timeout):
         print("Error: Request timed out after 5 minutes", file=sys.stderr)
-        sys.exit(1)
+    else:
+        raise e
+    sys.exit(1)
+
+
+async def ainvoke_agent(
+    client: httpx.AsyncClient,
+    email_input: dict,
+    server_url: str = DEFAULT_SERVER_URL,
+    thread_id: Optional[str] = None,
+    source: str = "CLI",
+) -> dict:
+    """Send request to the email agent server without blocking the event loop."""
+    url = f"{server_url}/invoke"
+    payload = create_payload(email_input, thread_id, source)
+    
+    response = await client.post(url, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def run_batch(
+    requests_data: list[dict],
+    server_url: str = DEFAULT_SERVER_URL,
+    concurrency: int = 8,
+) -> list:
+    """Invoke the agent for every request, keeping at most `concurrency` in flight.
+
+    Returns results in input order; failed requests are returned as exceptions.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with create_async_client() as client:
+        async def invoke_one(request_data: dict) -> dict:
+            async with semaphore:
+                return await ainvoke_agent(
+                    client,
+                    email_input=request_data["email_input"],
+                    server_url=server_url,
+                    thread_id=request_data.get("thread_id"),
+                    source=request_data.get("source", "CLI"),
+                )
+        
+        return await asyncio.gather(
+            *(invoke_one(request_data) for request_data in requests_data),
+            return_exceptions=True,
+        )
+
+
+def load_batch(path: str) -> list[dict]:
+    """Load /invoke request bodies from a JSON Lines file (one request per line)."""
+    with open(path) as f:
+        return [orjson.loads(line) for line in f if line.strip()]
 
 
 def format_response(result: dict) -> str:
@@ -102,7 +247,7 @@ def format_response(result: dict) -> str:
     if not output_parts:
         output_parts.append("Agent Result:")
         output_parts.append("=" * 50)
-        output_parts.append(json.dumps(result, indent=2))
+        output_parts.append(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
     
     return "\n".join(output_parts)
 
@@ -121,32 +266,33 @@ Examples:
   python -m client.cli --from "alice@example.com" --to "bob@example.com" \\
                        --subject "Re: Meeting Request" --thread-id "thread-123" \\
                        "Thanks for the help!"
+
+  # Process a batch of requests concurrently (one /invoke body per line)
+  python -m client.cli --batch emails.jsonl --concurrency 8
         """
     )
     
     parser.add_argument(
         "content",
+        nargs="?",
         help="Email content/body"
     )
     
     parser.add_argument(
         "--from",
         dest="from_email",
-        required=True,
-        help="Sender email address (required)"
+        help="Sender email address (required unless --batch)"
     )
     
     parser.add_argument(
         "--to",
         dest="to_email",
-        required=True,
-        help="Recipient email address (required)"
+        help="Recipient email address (required unless --batch)"
     )
     
     parser.add_argument(
         "--subject",
-        required=True,
-        help="Email subject line (required)"
+        help="Email subject line (required unless --batch)"
     )
     
     parser.add_argument(
@@ -166,8 +312,63 @@ Examples:
         help="Output raw JSON response"
     )
     
+    parser.add_argument(
+        "--keep-alive",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse a pooled HTTP connection to the server (default: enabled)"
+    )
+    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print graph updates as each node completes instead of waiting for the full result"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="JSON Lines file of /invoke request bodies to process concurrently"
+    )
+    
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=8,
+        help="Maximum in-flight requests in --batch mode (default: 8)"
+    )
+    
     args = parser.parse_args()
     
+    if args.batch:
+        results = asyncio.run(run_batch(
+            load_batch(args.batch),
+            server_url=args.server_url,
+            concurrency=args.concurrency,
+        ))
+        failed = False
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                failed = True
+                print(f"Error: Request {i} failed: {result}", file=sys.stderr)
+            elif args.json:
+                print(orjson.dumps(result).decode())
+            else:
+                print(f"--- Request {i} ---")
+                print(format_response(result["result"]))
+        sys.exit(1 if failed else 0)
+    
+    missing = [
+        flag for flag, value in (
+            ("content", args.content),
+            ("--from", args.from_email),
+            ("--to", args.to_email),
+            ("--subject", args.subject),
+        ) if value is None
+    ]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+    
     # Create email input
     email_input = create_email_input(
         content=args.content,
@@ -176,17 +377,39 @@ Examples:
         subject=args.subject,
     )
     
+    if args.stream:
+        for chunk in invoke_agent_stream(
+            email_input=email_input,
+            server_url=args.server_url,
+            thread_id=args.thread_id,
+            source="CLI",
+            keep_alive=args.keep_alive,
+        ):
+            if args.json:
+                print(orjson.dumps(chunk).decode(), flush=True)
+                if "error" in chunk:
+                    sys.exit(1)
+            elif "error" in chunk:
+                print(f"Error: {chunk['error']}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                for node, update in chunk["update"].items():
+                    print(f"[{node}]")
+                    print(format_response(update or {}), flush=True)
+        return
+    
     # Invoke agent
     result = invoke_agent(
         email_input=email_input,
         server_url=args.server_url,
         thread_id=args.thread_id,
         source="CLI",
+        keep_alive=args.keep_alive,
     )
     
     # Output result
     if args.json:
-        print(json.dumps(result, indent=2))
+        print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
     else:
         print(format_response(result["result"]))
 
@@ -0,0 +1,30 @@
+"""
+Run the email agent server with uvloop and httptools.
+
+Usage:
+    python -m server
+
+Each worker process runs its own lifespan, so it spawns its own MCP stdio
+subprocess and has its own AGENT_CONCURRENCY limit.
+"""
+
+import os
+import sys
+
+import uvicorn
+
+
+def main():
+    uvicorn.run(
+        "server.server:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # uvloop is not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,25 @@
+import asyncio
 import sys
+import httpx
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from string import Template
 from pathlib import Path
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Literal, TypedDict, Optional
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import date
 
+from langchain_core.messages import AIMessage
 from langchain_openai import ChatOpenAI
 from dataclasses import dataclass
 from langgraph.graph import StateGraph, START, END, MessagesState
 from langgraph.runtime import Runtime
 from langgraph.types import Command
 
-from .utils import get_triage_instructions, get_action_instructions, parse_email, format_email_markdown
+from .utils import EmailInput, get_triage_instructions, get_action_instructions, parse_email, format_email_markdown
 
 # Load .env from project root (one level up from server/)
 env_path = Path(__file__).parent.parent / ".env"
@@ -43,10 +50,10 @@ class RouterSchema(BaseModel):
     )
 
 class StateInput(TypedDict):
-    email_input: dict
+    email_input: EmailInput
 
 class State(MessagesState):
-    email_input: dict
+    email_input: EmailInput
     classification_decision: Literal["ignore", "respond", "notify"]
 
 # Runtime context schema for configurable fields
@@ -54,14 +61,31 @@ class State(MessagesState):
 class ContextSchema:
     source: Optional[str] = None
 
+# ----- Prompt templates -----
+TRIAGE_USER_PROMPT = Template("""
+Please determine how to handle the below email thread:
+
+From: $author
+To: $to
+Subject: $subject
+$email_thread""")
+
+# Today's date string, recomputed only when the day changes
+_DATE_CACHE = {"day": None, "s": ""}
+
+def _today_str() -> str:
+    today = date.today()
+    if today != _DATE_CACHE["day"]:
+        _DATE_CACHE.update(day=today, s=today.isoformat())
+    return _DATE_CACHE["s"]
+
 # ----- Node and edge function templates (pass context in setup) -----
-def create_llm_call(llm_with_tools):
-    def llm_call(state: State, runtime: Runtime[ContextSchema]):
-        agent_system_prompt = get_action_instructions()
-        
-        # Get source from runtime context
-        source = runtime.context.source
-        
+def create_action_system_prompt(action_prompt):
+    """Create a function building the response agent's system prompt for a given source"""
+    # Split the prompt around its {today} placeholder once, so each turn only concatenates
+    prompt_head, _, prompt_tail = action_prompt.partition("{today}")
+
+    def action_system_prompt(source: Optional[str]) -> str:
         # Add source-specific instruction to prompt
         source_instruction = ""
         if source == "slack":
@@ -69,11 +93,18 @@ def create_llm_call(llm_with_tools):
         elif source == "CLI":
             source_instruction = "\n\nNote: This request was received via CLI. Provide detailed and well-formatted responses suitable for command-line interface."
         
-        full_prompt = agent_system_prompt.format(today=datetime.now().strftime("%Y-%m-%d")) + source_instruction
+        return prompt_head + _today_str() + prompt_tail + source_instruction
+    return action_system_prompt
+
+def create_llm_call(llm_with_tools, action_system_prompt):
+    async def llm_call(state: State, runtime: Runtime[ContextSchema]):
+        # Get source from runtime context (absent when the caller passes no context)
+        source = runtime.context.source if runtime.context else None
+        full_prompt = action_system_prompt(source)
         
         return {
             "messages": [
-                llm_with_tools.invoke([
+                await llm_with_tools.ainvoke([
                     {"role": "system", "content": full_prompt}
                 ] + state["messages"])
             ]
@@ -81,67 +112,119 @@ def create_llm_call(llm_with_tools):
     return llm_call
 
 def create_tool_node(tools_by_name):
+    get_tool = tools_by_name.__getitem__
+
     async def tool_node(state: State):
-        result = []
-        for tool_call in state["messages"][-1].tool_calls:
-            tool = tools_by_name[tool_call["name"]]
-            observation = await tool.ainvoke(tool_call["args"])
-            result.append({"role": "tool", "content" : observation, "tool_call_id": tool_call["id"]})
+        tool_calls = state["messages"][-1].tool_calls
+        # Run tool calls concurrently; gather preserves order so results line up with tool_calls
+        observations = await asyncio.gather(
+            *(get_tool(tool_call["name"]).ainvoke(tool_call["args"]) for tool_call in tool_calls)
+        )
+        result = [
+            {"role": "tool", "content" : observation, "tool_call_id": tool_call["id"]}
+            for tool_call, observation in zip(tool_calls, observations)
+        ]
         return {"messages": result}
     return tool_node
 
 def should_continue(state: State) -> Literal["Action", "__end__"]:
     """Route to Action, or end if Done tool called"""
-    messages = state["messages"]
-    last_message = messages[-1]
-    if last_message.tool_calls:
-        for tool_call in last_message.tool_calls:
-            if tool_call["name"] == "Done":
-                return END
-            else:
-                return "Action"
-
-def create_triage_router(llm_router):
-    """Create triage_router function with llm_router dependency"""
-    def triage_router(state: State) -> Command[Literal["response_agent", "__end__"]]:
+    # parallel_tool_calls=False means only the first tool call matters
+    tool_calls = state["messages"][-1].tool_calls
+    if not tool_calls or tool_calls[0]["name"] == "Done":
+        return END
+    return "Action"
+
+def route_entry(state: State) -> Literal["agent", "Action", "__end__"]:
+    """Start the response agent at its LLM call, unless triage already seeded the first reply"""
+    if isinstance(state["messages"][-1], AIMessage):
+        return should_continue(state)
+    return "agent"
+
+def _discard_task(task: asyncio.Task):
+    """Cancel a task we no longer need, retrieving its exception if it already failed"""
+    task.cancel()
+    # Avoids asyncio's "Task exception was never retrieved" warning for already-failed tasks
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+TRIAGE_CACHE_SIZE = 4096  # triage decisions remembered per router
+
+def _email_digest(author: str, to: str, subject: str, email_thread: str) -> bytes:
+    """Content hash identifying an email for the triage cache"""
+    return blake2b("\0".join((author, to, subject, email_thread)).encode(), digest_size=16).digest()
+
+def create_triage_router(llm_router, triage_prompt, llm_with_tools, action_system_prompt):
+    """Create triage_router function with router and response agent LLM dependencies"""
+    # Triage runs at temperature 0, so a repeated email reuses the earlier decision (LRU)
+    triage_cache: OrderedDict[bytes, RouterSchema] = OrderedDict()
+
+    async def triage_router(state: State, runtime: Runtime[ContextSchema]) -> Command[Literal["response_agent", "__end__"]]:
         """
         Analyze email content to decide if we should respond, notify, or ignore.
         """
         author, to, subject, email_thread = parse_email(state["email_input"])
-        system_prompt = get_triage_instructions()
 
-        user_prompt = """
-Please determine how to handle the below email thread:
+        def build_respond_message():
+            email_markdown = format_email_markdown(subject, author, to, email_thread)
+            return {"role": "user", "content": f"Respond to the email: {email_markdown}"}
 
-From: {author}
-To: {to}
-Subject: {subject}
-{email_thread}""".format(
-            author=author, to=to, subject=subject, email_thread=email_thread
-        )
+        respond_message = None
+        speculative_reply = None
+        cache_key = _email_digest(author, to, subject, email_thread)
+        result = triage_cache.get(cache_key)
+        if result is not None:
+            triage_cache.move_to_end(cache_key)
+        else:
+            user_prompt = TRIAGE_USER_PROMPT.substitute(
+                author=author, to=to, subject=subject, email_thread=email_thread
+            )
 
-        # Create email markdown for Agent Inbox in case of notification  
-        email_markdown = format_email_markdown(subject, author, to, email_thread)
+            # Speculatively start the response agent's first LLM call while the router decides;
+            # it is the same request llm_call would send, and is discarded unless we respond.
+            # This needs the email markdown up front, so cache misses format it before triage.
+            source = runtime.context.source if runtime.context else None
+            respond_message = build_respond_message()
+            speculative_reply = asyncio.create_task(llm_with_tools.ainvoke(
+                [{"role": "system", "content": action_system_prompt(source)}]
+                + state["messages"]
+                + [respond_message]
+            ))
 
-        # Run the router LLM
-        result = llm_router.invoke(
-            [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ]
-        )
+            # Run the router LLM
+            try:
+                result = await llm_router.ainvoke(
+                    [
+                        {"role": "system", "content": triage_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ]
+                )
+            except BaseException:
+                _discard_task(speculative_reply)
+                raise
+            triage_cache[cache_key] = result
+            if len(triage_cache) > TRIAGE_CACHE_SIZE:
+                triage_cache.popitem(last=False)
 
         # Decision
         classification = result.classification
 
+        if classification != "respond" and speculative_reply is not None:
+            _discard_task(speculative_reply)
+
         if classification == "respond":
             goto = "response_agent"
-            # Add the email to the messages
+            # Add the email to the messages (cache hits format it only now that we know to respond)
+            messages = [respond_message or build_respond_message()]
+            if speculative_reply is not None:
+                try:
+                    # Seed the agent's first reply so the response agent skips that LLM call
+                    messages.append(await speculative_reply)
+                except Exception:
+                    # The response agent will make the call itself and surface any error
+                    pass
             update = {
                 "classification_decision": result.classification,
-                "messages": [{"role": "user",
-                                "content": f"Respond to the email: {email_markdown}"
-                            }],
+                "messages": messages,
             }
         elif result.classification == "ignore":
             update =  { "classification_decision": result.classification}
@@ -155,45 +238,97 @@ Subject: {subject}
     return triage_router
 
 # ----- Main setup function -----
-async def setup_email_assistant():
+MCP_PING_INTERVAL = 30  # seconds between MCP heartbeats
+
+def create_openai_http_client() -> httpx.AsyncClient:
+    """Create the HTTP/2 client shared by all OpenAI calls; the caller is responsible for closing it"""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=httpx.Timeout(60),
+    )
+
+def _compile_assistant(tools, tools_by_name, http_client: httpx.AsyncClient):
+    """Compile the email assistant graph; the tool node looks tools up in tools_by_name at call time"""
+    llm = ChatOpenAI(model="gpt-4.1", temperature=0.0, http_async_client=http_client)
+    llm_with_tools = llm.bind_tools(tools, tool_choice="any", parallel_tool_calls=False)
+    # strict=True makes OpenAI enforce RouterSchema exactly (json_schema is already the default method)
+    llm_router = llm.with_structured_output(RouterSchema, method="json_schema", strict=True)
+
+    # Build prompts once per setup rather than on every graph step
+    action_system_prompt = create_action_system_prompt(get_action_instructions())
+    triage_prompt = get_triage_instructions()
+
+    # Build response agent workflow
+    agent_builder = StateGraph(State, context_schema=ContextSchema)
+    agent_builder.add_node("agent", create_llm_call(llm_with_tools, action_system_prompt))
+    agent_builder.add_node("tools", create_tool_node(tools_by_name))
+    agent_builder.add_conditional_edges(
+        START,
+        route_entry,
+        {
+            "agent": "agent",
+            "Action": "tools",
+            END: END,
+        },
+    )
+    agent_builder.add_conditional_edges(
+        "agent",
+        should_continue,
+        {
+            # Name returned by should_continue : Name of next node to visit
+            "Action": "tools",
+            END: END,
+        },
+    )
+    agent_builder.add_edge("tools", "agent")
+
+    # Compile the agent
+    agent = agent_builder.compile()
+
+    # Build overall workflow with triage router
+    triage_router = create_triage_router(llm_router, triage_prompt, llm_with_tools, action_system_prompt)
+    overall_workflow = (
+        StateGraph(State, input=StateInput, context_schema=ContextSchema)
+        .add_node(triage_router)
+        .add_node("response_agent", agent)
+        .add_edge(START, "triage_router")
+    )
+    return overall_workflow.compile()
+
+async def _build_assistant(session: ClientSession, http_client: httpx.AsyncClient):
+    """Load MCP tools from an initialized session and compile the email assistant graph"""
+    tools = await load_mcp_tools(session)
+    return _compile_assistant(tools, {tool.name: tool for tool in tools}, http_client)
+
+async def _ping_forever(session: ClientSession, interval: float = MCP_PING_INTERVAL):
+    """Periodically ping the MCP server to keep the stdio link healthy; stops after the first failure"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await session.send_ping()
+        except Exception as e:
+            print(f"MCP ping failed, stopping heartbeat: {e}", file=sys.stderr)
+            return
+
+@asynccontextmanager
+async def _mcp_session():
+    """Open and initialize one MCP stdio session, kept alive by a background heartbeat"""
     async with stdio_client(server_params) as (read, write):
         async with ClientSession(read, write) as session:
             await session.initialize()
-            tools = await load_mcp_tools(session)
-            tools_by_name = {tool.name: tool for tool in tools}
-            llm = ChatOpenAI(model="gpt-4.1", temperature=0.0)
-            llm_with_tools = llm.bind_tools(tools, tool_choice="any", parallel_tool_calls=False)
-            llm_router = llm.with_structured_output(RouterSchema)
-
-            # Build response agent workflow
-            agent_builder = StateGraph(State, context_schema=ContextSchema)
-            agent_builder.add_node("agent", create_llm_call(llm_with_tools))
-            agent_builder.add_node("tools", create_tool_node(tools_by_name))
-            agent_builder.add_edge(START, "agent")
-            agent_builder.add_conditional_edges(
-                "agent",
-                should_continue,
-                {
-                    # Name returned by should_continue : Name of next node to visit
-                    "Action": "tools",
-                    END: END,
-                },
-            )
-            agent_builder.add_edge("tools", "agent")
-
-            # Compile the agent
-            agent = agent_builder.compile()
-
-            # Build overall workflow with triage router
-            triage_router = create_triage_router(llm_router)
-            overall_workflow = (
-                StateGraph(State, input=StateInput, context_schema=ContextSchema)
-                .add_node(triage_router)
-                .add_node("response_agent", agent)
-                .add_edge(START, "triage_router")
-            )
-            email_assistant = overall_workflow.compile()
-            yield email_assistant
+            heartbeat = asyncio.create_task(_ping_forever(session))
+            try:
+                yield session
+            finally:
+                heartbeat.cancel()
+                # Make sure the heartbeat is stopped before the session is torn down
+                with suppress(asyncio.CancelledError):
+                    await heartbeat
+
+async def setup_email_assistant():
+    async with create_openai_http_client() as http_client, _mcp_session() as session:
+        yield await _build_assistant(session, http_client)
 
 # Usage example:
 # async for email_assistant in setup_email_assistant():
@@ -205,41 +340,38 @@ async def setup_email_assistant():
 # Studio Function
 @asynccontextmanager
 async def studio_email_assistant():
+    async with create_openai_http_client() as http_client, _mcp_session() as session:
+        yield await _build_assistant(session, http_client)
+
+
+# ----- Preloaded graph (shared across forked workers) -----
+async def _load_tools_once():
     async with stdio_client(server_params) as (read, write):
         async with ClientSession(read, write) as session:
             await session.initialize()
-            tools = await load_mcp_tools(session)
-            tools_by_name = {tool.name: tool for tool in tools}
-            llm = ChatOpenAI(model="gpt-4.1", temperature=0.0)
-            llm_with_tools = llm.bind_tools(tools, tool_choice="any", parallel_tool_calls=False)
-            llm_router = llm.with_structured_output(RouterSchema)
-
-            # Build response agent workflow
-            agent_builder = StateGraph(State, context_schema=ContextSchema)
-            agent_builder.add_node("agent", create_llm_call(llm_with_tools))
-            agent_builder.add_node("tools", create_tool_node(tools_by_name))
-            agent_builder.add_edge(START, "agent")
-            agent_builder.add_conditional_edges(
-                "agent",
-                should_continue,
-                {
-                    # Name returned by should_continue : Name of next node to visit
-                    "Action": "tools",
-                    END: END,
-                },
-            )
-            agent_builder.add_edge("tools", "agent")
-
-            # Compile the agent
-            agent = agent_builder.compile()
-
-            # Build overall workflow with triage router
-            triage_router = create_triage_router(llm_router)
-            overall_workflow = (
-                StateGraph(State, input=StateInput, context_schema=ContextSchema)
-                .add_node(triage_router)
-                .add_node("response_agent", agent)
-                .add_edge(START, "triage_router")
-            )
-            email_assistant = overall_workflow.compile()
-            yield email_assistant
+            return await load_mcp_tools(session)
+
+def preload_email_assistant():
+    """Compile the email assistant without keeping an MCP session open.
+
+    Intended to run in a parent process before forking workers (e.g. gunicorn --preload)
+    so the compiled graph is shared copy-on-write. The returned tools are only used for
+    their schemas; each process must rebind them with attach_mcp_session before invoking.
+
+    Returns:
+        tuple: (compiled graph, tools_by_name mapping used by its tool node,
+                shared OpenAI HTTP client to close on shutdown)
+    """
+    # Run on a dedicated thread so this also works when called from inside a running event loop
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        tools = executor.submit(asyncio.run, _load_tools_once()).result()
+    tools_by_name = {tool.name: tool for tool in tools}
+    http_client = create_openai_http_client()
+    return _compile_assistant(tools, tools_by_name, http_client), tools_by_name, http_client
+
+@asynccontextmanager
+async def attach_mcp_session(tools_by_name):
+    """Open this process's MCP session and rebind a preloaded graph's tools to it"""
+    async with _mcp_session() as session:
+        tools_by_name.update({tool.name: tool for tool in await load_mcp_tools(session)})
+        yield session
@@ -13,8 +13,7 @@ def schedule_meeting(
 ) -> str:
     """Schedule a calendar meeting."""
     # Placeholder response - in real app would check calendar and schedule
-    date_str = preferred_day.strftime("%A, %B %d, %Y")
-    return f"Meeting '{subject}' scheduled on {date_str} at {start_time} for {duration_minutes} minutes with {len(attendees)} attendees"
+    return f"Meeting '{subject}' scheduled on {preferred_day:%A, %B %d, %Y} at {start_time} for {duration_minutes} minutes with {len(attendees)} attendees"
 
 @mcp.tool(description="Check calendar availability for a given day.")
 def check_calendar_availability(day: str) -> str:
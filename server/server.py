@@ -1,4 +1,9 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import os
+import msgspec
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from contextlib import asynccontextmanager
@@ -9,77 +14,183 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
-from server.email_agent import studio_email_assistant, StateInput, ContextSchema
+from server.email_agent import (
+    studio_email_assistant,
+    preload_email_assistant,
+    attach_mcp_session,
+    StateInput,
+    ContextSchema,
+)
+from server.utils import EmailInput
 
 
-# Request/Response models
-class InvokeRequest(BaseModel):
-    email_input: Dict[str, Any]
+# Request/Response models (msgspec decodes/encodes JSON directly, skipping pydantic validation)
+class InvokeRequest(msgspec.Struct):
+    email_input: EmailInput
     thread_id: Optional[str] = None
     source: Optional[str] = None
 
 
-class InvokeResponse(BaseModel):
+class InvokeResponse(msgspec.Struct):
     result: Dict[str, Any]
 
 
+def _enc_hook(obj: Any) -> Any:
+    """Serialize LangChain messages (pydantic models) for msgspec."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise NotImplementedError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_request_decoder = msgspec.json.Decoder(InvokeRequest)
+_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+
 # Global agent instance
 email_assistant = None
 
+# Compile the graph at import time so a pre-forking server (gunicorn --preload) shares it across workers
+PRELOAD_GRAPH = os.getenv("PRELOAD_GRAPH", "").strip().lower() in ("1", "true", "yes", "on")
+_preloaded_assistant = preload_email_assistant() if PRELOAD_GRAPH else None
+
+# Maximum number of agent invocations (and therefore LLM calls) in flight at once
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "8"))
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage agent lifecycle"""
     global email_assistant
-    async with studio_email_assistant() as agent:
-        email_assistant = agent
-        yield
+    app.state.llm_sema = asyncio.Semaphore(AGENT_CONCURRENCY)
+    if _preloaded_assistant is not None:
+        # Reuse the preloaded graph; only the MCP stdio session is per-process
+        agent, tools_by_name, http_client = _preloaded_assistant
+        async with http_client, attach_mcp_session(tools_by_name):
+            email_assistant = agent
+            yield
+    else:
+        async with studio_email_assistant() as agent:
+            email_assistant = agent
+            yield
     email_assistant = None
 
 
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """GZip responses, except on streaming endpoints where the compressor would buffer updates"""
+
+    def __init__(self, app, uncompressed_paths=frozenset(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.uncompressed_paths = uncompressed_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.uncompressed_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 # Create FastAPI app with lifespan
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    StreamingAwareGZipMiddleware,
+    minimum_size=1024,
+    uncompressed_paths=frozenset({"/invoke/stream"}),
+)
+
+
+def _invoke_kwargs(request: InvokeRequest) -> Dict[str, Any]:
+    """Build the ainvoke/astream keyword arguments (context and config) for a request."""
+    # Construct context for source (runtime configuration)
+    context = ContextSchema(source=request.source) if request.source else None
+    
+    # Construct config for thread_id (checkpointing/thread management)
+    config = {}
+    if request.thread_id:
+        config["configurable"] = {"thread_id": request.thread_id}
+    
+    # Invoke agent with context and/or config
+    invoke_kwargs = {}
+    if context:
+        invoke_kwargs["context"] = context
+    if config:
+        invoke_kwargs["config"] = config
+    return invoke_kwargs
 
 
-@app.post("/invoke", response_model=InvokeResponse)
-async def invoke_agent(request: InvokeRequest):
+async def _decode_request(http_request: Request) -> InvokeRequest:
+    """Decode and validate the request body as an InvokeRequest."""
+    try:
+        return _request_decoder.decode(await http_request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid request: {str(e)}")
+
+
+@app.post("/invoke")
+async def invoke_agent(http_request: Request):
     """
     Invoke the email agent with email input and optional config.
     """
     if email_assistant is None:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
+    request = await _decode_request(http_request)
+    
     try:
         # Prepare input
         input_data: StateInput = {
             "email_input": request.email_input
         }
         
-        # Construct context for source (runtime configuration)
-        context = ContextSchema(source=request.source) if request.source else None
-        
-        # Construct config for thread_id (checkpointing/thread management)
-        config = {}
-        if request.thread_id:
-            config["configurable"] = {"thread_id": request.thread_id}
-        
-        # Invoke agent with context and/or config
-        invoke_kwargs = {}
-        if context:
-            invoke_kwargs["context"] = context
-        if config:
-            invoke_kwargs["config"] = config
+        async with app.state.llm_sema:
+            result = await email_assistant.ainvoke(input_data, **_invoke_kwargs(request))
         
-        result = await email_assistant.ainvoke(input_data, **invoke_kwargs)
-        
-        return InvokeResponse(result=result)
+        return Response(_encoder.encode(InvokeResponse(result=result)), media_type="application/json")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error invoking agent: {str(e)}")
 
 
+@app.post("/invoke/stream")
+async def invoke_agent_stream(http_request: Request):
+    """
+    Invoke the email agent and stream each node's state update as newline-delimited JSON.
+    """
+    if email_assistant is None:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    request = await _decode_request(http_request)
+    input_data: StateInput = {
+        "email_input": request.email_input
+    }
+    invoke_kwargs = _invoke_kwargs(request)
+    
+    async def generate():
+        try:
+            async with app.state.llm_sema:
+                async for namespace, update in email_assistant.astream(
+                    input_data, stream_mode="updates", subgraphs=True, **invoke_kwargs
+                ):
+                    line = {"namespace": list(namespace), "update": update}
+                    yield _encoder.encode(line) + b"\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield _encoder.encode({"error": f"Error invoking agent: {str(e)}"}) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
     return {"status": "healthy", "agent_initialized": email_assistant is not None}
 
+
+@app.get("/metrics")
+async def metrics():
+    """Agent concurrency gauges for tuning AGENT_CONCURRENCY"""
+    available = app.state.llm_sema._value
+    return {
+        "agent_concurrency_limit": AGENT_CONCURRENCY,
+        "agent_slots_available": available,
+        "agent_in_flight": AGENT_CONCURRENCY - available,
+    }
@@ -1,3 +1,14 @@
+from typing_extensions import TypedDict
+
+
+class EmailInput(TypedDict):
+    """Email fields; the HTTP server validates these once when decoding the request."""
+    author: str
+    to: str
+    subject: str
+    email_thread: str
+
+
 def get_triage_instructions():
     return """
 < Role >
@@ -108,11 +119,11 @@ Times later in the day are preferable.
 """
 
 
-def parse_email(email_input: dict) -> dict:
+def parse_email(email_input: EmailInput) -> tuple[str, str, str, str]:
     """Parse an email input dictionary.
 
     Args:
-        email_input (dict): Dictionary containing email fields:
+        email_input (EmailInput): Dictionary containing email fields:
             - author: Sender's name and email
             - to: Recipient's name and email
             - subject: Email subject line